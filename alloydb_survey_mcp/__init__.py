@@ -1,3 +1,20 @@
 """AlloyDB Survey MCP Server Package"""
 
+from dotenv import load_dotenv
+
 __version__ = "1.0.0"
+
+_dotenv_loaded = False
+
+
+def load_env() -> None:
+    """Load the .env file into the environment, at most once per process"""
+    global _dotenv_loaded
+    
+    if not _dotenv_loaded:
+        load_dotenv(override=False)
+        _dotenv_loaded = True
+
+
+# Load environment variables before any submodule reads them
+load_env()
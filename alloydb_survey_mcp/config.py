@@ -1,56 +1,78 @@
 """Configuration management for the MCP server"""
 
 import os
+import functools
+from dataclasses import dataclass, field
 from typing import Optional
-from pydantic import BaseModel, Field
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
 
-
-class AlloyDBConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class AlloyDBConfig:
     """Configuration for Alloy DB connection"""
     
-    project_id: str = Field(..., description="GCP Project ID")
-    region: str = Field(..., description="Alloy DB region")
-    cluster_id: str = Field(..., description="Alloy DB cluster ID")
-    instance_id: str = Field(..., description="Alloy DB instance ID")
-    database: str = Field(default="postgres", description="Database name")
-    user: str = Field(default="postgres", description="Database user")
-    password: Optional[str] = Field(default=None, description="Database password")
+    project_id: str  # GCP Project ID
+    region: str  # Alloy DB region
+    cluster_id: str  # Alloy DB cluster ID
+    instance_id: str  # Alloy DB instance ID
+    database: str = "postgres"  # Database name
+    user: str = "postgres"  # Database user
+    password: Optional[str] = None  # Database password
+    pool_size: int = 25  # Maximum number of pooled connections
+    max_rows: int = 1000  # Upper bound for any query's row limit
+    keepalive_interval: int = 240  # Seconds between pool keep-alive pings (0 disables)
+    
+    # Full instance connection name, derived once from the fields above
+    instance_connection_name: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if not all([self.project_id, self.region, self.cluster_id, self.instance_id]):
+            raise ValueError("Missing required Alloy DB configuration parameters")
+        
+        # Frozen dataclass: bypass __setattr__ for the derived field
+        object.__setattr__(
+            self,
+            "instance_connection_name",
+            f"{self.project_id}:{self.region}:{self.cluster_id}:{self.instance_id}",
+        )
     
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def from_env(cls) -> "AlloyDBConfig":
-        """Create configuration from environment variables"""
+        """Create configuration from environment variables.
+        
+        The result is cached; call ``AlloyDBConfig.from_env.cache_clear()``
+        to pick up environment changes.
+        """
+        env = os.environ
         return cls(
-            project_id=os.getenv("ALLOYDB_PROJECT_ID"),
-            region=os.getenv("ALLOYDB_REGION"),
-            cluster_id=os.getenv("ALLOYDB_CLUSTER_ID"),
-            instance_id=os.getenv("ALLOYDB_INSTANCE_ID"),
-            database=os.getenv("ALLOYDB_DATABASE", "postgres"),
-            user=os.getenv("ALLOYDB_USER", "postgres"),
-            password=os.getenv("ALLOYDB_PASSWORD"),
+            project_id=env.get("ALLOYDB_PROJECT_ID"),
+            region=env.get("ALLOYDB_REGION"),
+            cluster_id=env.get("ALLOYDB_CLUSTER_ID"),
+            instance_id=env.get("ALLOYDB_INSTANCE_ID"),
+            database=env.get("ALLOYDB_DATABASE", "postgres"),
+            user=env.get("ALLOYDB_USER", "postgres"),
+            password=env.get("ALLOYDB_PASSWORD"),
+            pool_size=int(env.get("ALLOYDB_POOL_SIZE", "25")),
+            max_rows=int(env.get("ALLOYDB_MAX_ROWS", "1000")),
+            keepalive_interval=int(env.get("ALLOYDB_KEEPALIVE_SECONDS", "240")),
         )
-    
-    @property
-    def instance_connection_name(self) -> str:
-        """Get the full instance connection name"""
-        return f"{self.project_id}:{self.region}:{self.cluster_id}:{self.instance_id}"
 
 
-class MCPServerConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class MCPServerConfig:
     """Configuration for the MCP server"""
     
-    name: str = Field(default="alloydb-survey-server", description="Server name")
-    version: str = Field(default="1.0.0", description="Server version")
-    log_level: str = Field(default="INFO", description="Logging level")
+    name: str = "alloydb-survey-server"  # Server name
+    version: str = "1.0.0"  # Server version
+    log_level: str = "INFO"  # Logging level
     
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def from_env(cls) -> "MCPServerConfig":
-        """Create configuration from environment variables"""
+        """Create configuration from environment variables (cached)"""
+        env = os.environ
         return cls(
-            name=os.getenv("MCP_SERVER_NAME", "alloydb-survey-server"),
-            version=os.getenv("MCP_SERVER_VERSION", "1.0.0"),
-            log_level=os.getenv("LOG_LEVEL", "INFO"),
+            name=env.get("MCP_SERVER_NAME", "alloydb-survey-server"),
+            version=env.get("MCP_SERVER_VERSION", "1.0.0"),
+            log_level=env.get("LOG_LEVEL", "INFO"),
         )
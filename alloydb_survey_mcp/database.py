@@ -1,14 +1,148 @@
 """Database connection and query utilities for Alloy DB"""
 
-import os
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+import functools
+from typing import AsyncIterator, Dict, Final, List, Any, Optional, Tuple
 import asyncpg
+import orjson
+from async_lru import alru_cache
 from google.cloud.alloydb.connector import Connector
 import logging
 
+from .config import AlloyDBConfig
+
 logger = logging.getLogger(__name__)
 
+# Rows fetched per cursor round trip when streaming results to JSON
+CURSOR_PREFETCH: Final[int] = 500
+
+# Seconds that slow-changing lookup results (statistics, locations,
+# respondent types) are served from cache before being re-queried
+LOOKUP_CACHE_TTL: Final[int] = 300
+
+# Base survey query - adjust table and column names based on your schema
+SURVEY_QUERY_BASE: Final[str] = """
+        SELECT 
+            survey_id,
+            respondent_id,
+            survey_date,
+            location,
+            respondent_type,
+            questions_responses,
+            metadata,
+            created_at,
+            updated_at
+        FROM surveys
+        WHERE 1=1
+        """
+
+# Optional survey filters, in placeholder order (location ILIKE is served by
+# the trigram index in schema.sql)
+SURVEY_FILTER_CONDITIONS: Final[Tuple[str, ...]] = (
+    "survey_id = ${}",
+    "location ILIKE ${}",
+    "survey_date >= ${}",
+    "survey_date <= ${}",
+    "respondent_type = ${}",
+)
+
+SURVEY_STATISTICS_QUERY: Final[str] = """
+        SELECT 
+            COUNT(*) as total_surveys,
+            COUNT(DISTINCT location) as unique_locations,
+            COUNT(DISTINCT respondent_type) as respondent_types,
+            MIN(survey_date) as earliest_survey,
+            MAX(survey_date) as latest_survey,
+            COUNT(DISTINCT DATE(survey_date)) as survey_days
+        FROM surveys
+        """
+
+# Lookup lists aggregated server-side into a single array value
+LOCATIONS_QUERY: Final[str] = "SELECT array_agg(DISTINCT location ORDER BY location) FROM surveys WHERE location IS NOT NULL"
+
+RESPONDENT_TYPES_QUERY: Final[str] = "SELECT array_agg(DISTINCT respondent_type ORDER BY respondent_type) FROM surveys WHERE respondent_type IS NOT NULL"
+
+# Statistics, locations and respondent types fused into one JSON document, so
+# a summary costs a single round trip and needs no re-serialization
+SURVEY_SUMMARY_QUERY: Final[str] = f"""
+        SELECT json_build_object(
+            'statistics', (SELECT row_to_json(s) FROM ({SURVEY_STATISTICS_QUERY}) s),
+            'available_locations', COALESCE(
+                (SELECT json_agg(DISTINCT location ORDER BY location)
+                 FROM surveys WHERE location IS NOT NULL),
+                '[]'::json
+            ),
+            'available_respondent_types', COALESCE(
+                (SELECT json_agg(DISTINCT respondent_type ORDER BY respondent_type)
+                 FROM surveys WHERE respondent_type IS NOT NULL),
+                '[]'::json
+            )
+        )::text
+        """
+
+
+def _record_default(obj: Any) -> Any:
+    """orjson fallback: encode asyncpg records as mappings, anything else as str"""
+    if isinstance(obj, asyncpg.Record):
+        return dict(obj)
+    return str(obj)
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # Binary jsonb is a format version byte (1) followed by the JSON text
+    return b"\x01" + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return orjson.loads(memoryview(data)[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Pool init hook: encode and decode JSON columns with orjson.
+    
+    Both codecs use the binary wire format so values are handed to orjson as
+    bytes, skipping asyncpg's intermediate str decode.
+    """
+    await conn.set_type_codec(
+        "json",
+        schema="pg_catalog",
+        encoder=orjson.dumps,
+        decoder=orjson.loads,
+        format="binary",
+    )
+    await conn.set_type_codec(
+        "jsonb",
+        schema="pg_catalog",
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        format="binary",
+    )
+
+
+def to_dicts(rows: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+    """Convert asyncpg records to plain dictionaries for Python-side callers"""
+    return [dict(row) for row in rows]
+
+
+@functools.lru_cache(maxsize=32)
+def _survey_query_sql(filters: Tuple[bool, ...]) -> str:
+    """Build the survey query SQL for a combination of active filters.
+    
+    Every value, including LIMIT, is a bound parameter, so each filter
+    combination maps to one stable SQL text. asyncpg's per-connection
+    statement cache then prepares it once and reuses the server-side plan.
+    """
+    query = SURVEY_QUERY_BASE
+    param_count = 0
+    
+    for active, condition in zip(filters, SURVEY_FILTER_CONDITIONS):
+        if active:
+            param_count += 1
+            query += " AND " + condition.format(param_count)
+    
+    # Add ordering and limit
+    return query + f" ORDER BY survey_date DESC LIMIT ${param_count + 1}"
+
 
 class AlloyDBConnection:
     """Manages connection to Alloy DB and provides query methods"""
@@ -16,38 +150,34 @@ class AlloyDBConnection:
     def __init__(self):
         self.connector = None
         self.pool = None
-        self.project_id = os.getenv("ALLOYDB_PROJECT_ID")
-        self.region = os.getenv("ALLOYDB_REGION")
-        self.cluster_id = os.getenv("ALLOYDB_CLUSTER_ID")
-        self.instance_id = os.getenv("ALLOYDB_INSTANCE_ID")
-        self.database = os.getenv("ALLOYDB_DATABASE", "postgres")
-        self.user = os.getenv("ALLOYDB_USER", "postgres")
-        self.password = os.getenv("ALLOYDB_PASSWORD")
-        
-        if not all([self.project_id, self.region, self.cluster_id, self.instance_id]):
-            raise ValueError("Missing required Alloy DB configuration parameters")
+        self._cfg = AlloyDBConfig.from_env()
+        self._instance_connection_name = self._cfg.instance_connection_name
     
     async def initialize(self):
         """Initialize the connection pool"""
         try:
             self.connector = Connector()
             
-            # Create the instance connection name
-            instance_connection_name = f"{self.project_id}:{self.region}:{self.cluster_id}:{self.instance_id}"
-            
-            # Create connection function
-            async def getconn():
+            # Create connection function; the pool passes its own connect
+            # arguments, which the connector does not need
+            async def getconn(*args, **kwargs):
                 conn = await self.connector.connect_async(
-                    instance_connection_name,
+                    self._instance_connection_name,
                     "asyncpg",
-                    user=self.user,
-                    password=self.password,
-                    db=self.database,
+                    user=self._cfg.user,
+                    password=self._cfg.password,
+                    db=self._cfg.database,
                 )
                 return conn
             
-            # Store the connection function for later use
-            self._getconn = getconn
+            # Build a pool on top of the connector so connections (and their
+            # TLS + auth handshake) are reused across queries
+            self.pool = await asyncpg.create_pool(
+                min_size=min(2, self._cfg.pool_size),
+                max_size=self._cfg.pool_size,
+                connect=getconn,
+                init=_init_connection,
+            )
             
             logger.info("Successfully initialized Alloy DB connection pool")
             
@@ -55,33 +185,174 @@ class AlloyDBConnection:
             logger.error(f"Failed to initialize Alloy DB connection: {e}")
             raise
     
+    async def warmup(self):
+        """Run a trivial query on each of the pool's minimum connections.
+        
+        Forces their TLS and auth handshakes to complete up front, so the first
+        tool call does not pay for them.
+        """
+        if not self.pool:
+            raise RuntimeError("Database connection not initialized")
+        
+        async def ping():
+            async with self.pool.acquire() as conn:
+                await conn.execute("SELECT 1")
+        
+        # Concurrent acquires each take a different connection
+        await asyncio.gather(*(ping() for _ in range(self.pool.get_min_size())))
+    
+    async def keepalive(self):
+        """Re-run ``warmup`` every ``keepalive_interval`` seconds until cancelled.
+        
+        The default interval is below asyncpg's 300 second idle lifetime, so the
+        pool's minimum connections are never closed for inactivity.
+        """
+        interval = self._cfg.keepalive_interval
+        if interval <= 0:
+            return
+        
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.warmup()
+            except Exception as e:
+                logger.warning(f"Connection keep-alive failed: {e}")
+    
     async def close(self):
-        """Close the connector"""
+        """Close the connection pool and the connector"""
+        if self.pool:
+            await self.pool.close()
         if self.connector:
             await self.connector.close_async()
     
+    async def fetch_records(self, query: str, params: Optional[List] = None) -> List[asyncpg.Record]:
+        """Execute a query and return the raw asyncpg records.
+        
+        Use this when the rows go straight to orjson (see ``_record_default``)
+        and no Python-side dictionaries are needed.
+        """
+        if not self.pool:
+            raise RuntimeError("Database connection not initialized")
+        
+        try:
+            async with self.pool.acquire() as conn:
+                return await conn.fetch(query, *(params or ()))
+            
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+    
     async def execute_query(self, query: str, params: Optional[List] = None) -> List[Dict[str, Any]]:
         """Execute a query and return results as list of dictionaries"""
-        if not hasattr(self, '_getconn'):
+        return to_dicts(await self.fetch_records(query, params))
+    
+    async def execute_fetchrow(self, query: str, params: Optional[List] = None) -> Optional[asyncpg.Record]:
+        """Execute a query and return its first row, or None if it has none"""
+        if not self.pool:
             raise RuntimeError("Database connection not initialized")
         
-        conn = await self._getconn()
         try:
-            if params:
-                rows = await conn.fetch(query, *params)
-            else:
-                rows = await conn.fetch(query)
+            async with self.pool.acquire() as conn:
+                return await conn.fetchrow(query, *(params or ()))
             
-            # Convert rows to dictionaries
-            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+    
+    async def execute_fetchval(self, query: str, params: Optional[List] = None) -> Any:
+        """Execute a query and return the first column of its first row"""
+        if not self.pool:
+            raise RuntimeError("Database connection not initialized")
+        
+        try:
+            async with self.pool.acquire() as conn:
+                return await conn.fetchval(query, *(params or ()))
             
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             raise
-        finally:
-            await conn.close()
     
-    async def get_survey_data(
+    async def stream_query(
+        self,
+        query: str,
+        params: Optional[List] = None,
+        chunk_size: int = CURSOR_PREFETCH
+    ) -> AsyncIterator[asyncpg.Record]:
+        """Execute a query and yield its rows from a server-side cursor.
+        
+        Rows are fetched ``chunk_size`` at a time, so only one chunk of the
+        result set is resident in memory while the caller consumes it.
+        """
+        if not self.pool:
+            raise RuntimeError("Database connection not initialized")
+        
+        try:
+            async with self.pool.acquire() as conn:
+                # Cursors only exist inside a transaction
+                async with conn.transaction():
+                    async for row in conn.cursor(query, *(params or ()), prefetch=chunk_size):
+                        yield row
+            
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+    
+    async def execute_query_json(
+        self,
+        query: str,
+        params: Optional[List] = None,
+        key: str = "rows",
+        chunk_size: int = CURSOR_PREFETCH
+    ) -> bytearray:
+        """Execute a query and stream its rows into a JSON document.
+        
+        The document has the form ``{"<key>": [...], "count": N}``. Each row is
+        encoded as the cursor yields it and then dropped; the count goes last
+        because it is only known once the cursor is exhausted.
+        """
+        out = bytearray(b'{"%s":[' % key.encode())
+        count = 0
+        
+        async for row in self.stream_query(query, params, chunk_size):
+            if count:
+                out += b","
+            out += orjson.dumps(row, default=_record_default)
+            count += 1
+        
+        out += b'],"count":%d}' % count
+        return out
+    
+    async def copy_query_to_bytes(self, query: str, params: Optional[List] = None) -> bytearray:
+        """Execute a query through COPY and return its rows as CSV with a header.
+        
+        The copy protocol hands back raw CSV data, so asyncpg never builds a
+        Record per row; this is the cheapest way to move large result sets.
+        """
+        if not self.pool:
+            raise RuntimeError("Database connection not initialized")
+        
+        out = bytearray()
+        
+        async def write(chunk: bytes):
+            out.extend(chunk)
+        
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.copy_from_query(
+                    query, *(params or ()), output=write, format="csv", header=True
+                )
+            
+            return out
+            
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+    
+    def clamp_limit(self, limit: Any) -> int:
+        """Coerce a requested row limit into the range [0, max_rows]"""
+        return max(0, min(int(limit), self._cfg.max_rows))
+    
+    def _build_survey_query(
         self,
         survey_id: Optional[int] = None,
         location: Optional[str] = None,
@@ -89,86 +360,114 @@ class AlloyDBConnection:
         date_to: Optional[str] = None,
         respondent_type: Optional[str] = None,
         limit: int = 100
-    ) -> List[Dict[str, Any]]:
-        """Fetch survey data with optional filters"""
+    ) -> Tuple[str, List[Any]]:
+        """Build the filtered survey query and its parameters"""
         
-        # Base query - adjust table and column names based on your schema
-        base_query = """
-        SELECT 
+        values = (
             survey_id,
-            respondent_id,
-            survey_date,
-            location,
+            f"%{location}%" if location else None,
+            date_from,
+            date_to,
             respondent_type,
-            questions_responses,
-            metadata,
-            created_at,
-            updated_at
-        FROM surveys
-        WHERE 1=1
-        """
-        
-        params = []
-        param_count = 0
-        
-        # Add filters based on provided parameters
-        if survey_id:
-            param_count += 1
-            base_query += f" AND survey_id = ${param_count}"
-            params.append(survey_id)
+        )
+        filters = tuple(bool(value) for value in values)
         
-        if location:
-            param_count += 1
-            base_query += f" AND location ILIKE ${param_count}"
-            params.append(f"%{location}%")
+        params = [value for value, active in zip(values, filters) if active]
+        params.append(self.clamp_limit(limit))
         
-        if date_from:
-            param_count += 1
-            base_query += f" AND survey_date >= ${param_count}"
-            params.append(date_from)
+        return _survey_query_sql(filters), params
+    
+    async def get_survey_data(
+        self,
+        survey_id: Optional[int] = None,
+        location: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        respondent_type: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Fetch survey data with optional filters"""
         
-        if date_to:
-            param_count += 1
-            base_query += f" AND survey_date <= ${param_count}"
-            params.append(date_to)
+        query, params = self._build_survey_query(
+            survey_id, location, date_from, date_to, respondent_type, limit
+        )
+        return await self.execute_query(query, params)
+    
+    async def get_survey_data_json(
+        self,
+        survey_id: Optional[int] = None,
+        location: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        respondent_type: Optional[str] = None,
+        limit: int = 100
+    ) -> bytearray:
+        """Fetch survey data with optional filters as a ``{"surveys": [...], "count": N}`` document"""
         
-        if respondent_type:
-            param_count += 1
-            base_query += f" AND respondent_type = ${param_count}"
-            params.append(respondent_type)
+        query, params = self._build_survey_query(
+            survey_id, location, date_from, date_to, respondent_type, limit
+        )
+        return await self.execute_query_json(query, params, key="surveys")
+    
+    async def get_survey_data_csv(
+        self,
+        survey_id: Optional[int] = None,
+        location: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        respondent_type: Optional[str] = None,
+        limit: int = 100
+    ) -> bytearray:
+        """Fetch survey data with optional filters as CSV, via the COPY protocol"""
         
-        # Add ordering and limit
-        base_query += f" ORDER BY survey_date DESC LIMIT {limit}"
+        query, params = self._build_survey_query(
+            survey_id, location, date_from, date_to, respondent_type, limit
+        )
+        return await self.copy_query_to_bytes(query, params)
+    
+    async def stream_survey_data(
+        self,
+        survey_id: Optional[int] = None,
+        location: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        respondent_type: Optional[str] = None,
+        limit: int = 100,
+        chunk_size: int = CURSOR_PREFETCH
+    ) -> AsyncIterator[asyncpg.Record]:
+        """Stream survey data with optional filters, ``chunk_size`` rows per round trip"""
         
-        return await self.execute_query(base_query, params)
+        query, params = self._build_survey_query(
+            survey_id, location, date_from, date_to, respondent_type, limit
+        )
+        async for row in self.stream_query(query, params, chunk_size):
+            yield row
     
+    @alru_cache(maxsize=1, ttl=LOOKUP_CACHE_TTL)
     async def get_survey_statistics(self) -> Dict[str, Any]:
-        """Get basic statistics about survey data"""
-        
-        stats_query = """
-        SELECT 
-            COUNT(*) as total_surveys,
-            COUNT(DISTINCT location) as unique_locations,
-            COUNT(DISTINCT respondent_type) as respondent_types,
-            MIN(survey_date) as earliest_survey,
-            MAX(survey_date) as latest_survey,
-            COUNT(DISTINCT DATE(survey_date)) as survey_days
-        FROM surveys
-        """
+        """Get basic statistics about survey data (cached for LOOKUP_CACHE_TTL seconds)"""
         
-        result = await self.execute_query(stats_query)
-        return result[0] if result else {}
+        row = await self.execute_fetchrow(SURVEY_STATISTICS_QUERY)
+        return dict(row) if row else {}
     
+    @alru_cache(maxsize=1, ttl=LOOKUP_CACHE_TTL)
     async def get_locations(self) -> List[str]:
-        """Get all unique survey locations"""
+        """Get all unique survey locations (cached for LOOKUP_CACHE_TTL seconds)"""
         
-        query = "SELECT DISTINCT location FROM surveys WHERE location IS NOT NULL ORDER BY location"
-        result = await self.execute_query(query)
-        return [row['location'] for row in result]
+        # array_agg yields NULL rather than an empty array when nothing matches
+        return await self.execute_fetchval(LOCATIONS_QUERY) or []
     
+    @alru_cache(maxsize=1, ttl=LOOKUP_CACHE_TTL)
     async def get_respondent_types(self) -> List[str]:
-        """Get all unique respondent types"""
+        """Get all unique respondent types (cached for LOOKUP_CACHE_TTL seconds)"""
         
-        query = "SELECT DISTINCT respondent_type FROM surveys WHERE respondent_type IS NOT NULL ORDER BY respondent_type"
-        result = await self.execute_query(query)
-        return [row['respondent_type'] for row in result]
+        return await self.execute_fetchval(RESPONDENT_TYPES_QUERY) or []
+    
+    @alru_cache(maxsize=1, ttl=LOOKUP_CACHE_TTL)
+    async def get_survey_summary_json(self) -> str:
+        """Get statistics, locations and respondent types as one JSON document.
+        
+        The document is built by the database in a single query and cached
+        for LOOKUP_CACHE_TTL seconds.
+        """
+        return await self.execute_fetchval(SURVEY_SUMMARY_QUERY)
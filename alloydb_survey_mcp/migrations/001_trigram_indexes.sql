@@ -0,0 +1,11 @@
+-- Trigram indexes for substring search on existing databases
+-- (new databases get these from schema.sql)
+--
+-- location ILIKE '%...%' and questions_responses::text ILIKE '%...%' can
+-- use these GIN indexes instead of scanning and casting every row. The
+-- indexed expressions must match the ones used in the queries exactly.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_surveys_location_trgm ON surveys USING GIN(location gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_surveys_questions_trgm ON surveys USING GIN((questions_responses::text) gin_trgm_ops);
@@ -1,6 +1,9 @@
 -- Sample schema for survey data in Alloy DB
 -- Adjust this based on your actual survey data structure
 
+-- Trigram support for the substring (ILIKE '%...%') searches
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS surveys (
     survey_id SERIAL PRIMARY KEY,
     respondent_id VARCHAR(255) NOT NULL,
@@ -19,6 +22,11 @@ CREATE INDEX IF NOT EXISTS idx_surveys_location ON surveys(location);
 CREATE INDEX IF NOT EXISTS idx_surveys_respondent_type ON surveys(respondent_type);
 CREATE INDEX IF NOT EXISTS idx_surveys_questions_gin ON surveys USING GIN(questions_responses);
 
+-- Trigram indexes so location and question/response text searches are index
+-- lookups instead of sequential scans; the expressions must match the queries
+CREATE INDEX IF NOT EXISTS idx_surveys_location_trgm ON surveys USING GIN(location gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_surveys_questions_trgm ON surveys USING GIN((questions_responses::text) gin_trgm_ops);
+
 -- Sample data (remove this in production)
 INSERT INTO surveys (respondent_id, survey_date, location, respondent_type, questions_responses, metadata) VALUES 
 (
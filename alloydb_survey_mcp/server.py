@@ -2,11 +2,18 @@
 
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 from datetime import datetime
-import json
 import os
 
+import fastjsonschema
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # Not available on Windows
+    uvloop = None
+
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import (
@@ -18,14 +25,9 @@ from mcp.types import (
     CallToolResult,
     ReadResourceResult,
 )
-from pydantic import BaseModel
-from dotenv import load_dotenv
 
 from .database import AlloyDBConnection
 
-# Load environment variables
-load_dotenv()
-
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -37,14 +39,96 @@ app = Server("alloydb-survey-server")
 db_connection: Optional[AlloyDBConnection] = None
 
 
-class SurveyQueryParams(BaseModel):
-    """Parameters for survey data queries"""
-    survey_id: Optional[int] = None
-    location: Optional[str] = None
-    date_from: Optional[str] = None
-    date_to: Optional[str] = None
-    respondent_type: Optional[str] = None
-    limit: int = 100
+# Handler output: JSON already encoded to bytes (orjson, streamed cursors) or
+# text that needs no further encoding (JSON built by the database, errors)
+Payload = Union[str, bytes, bytearray]
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode a payload as compact JSON, stringifying unknown types"""
+    return orjson.dumps(obj, default=str)
+
+
+def _text(payload: Payload) -> str:
+    """Turn handler output into the str TextContent requires.
+    
+    This is the only place encoded payloads are decoded, so each response is
+    converted exactly once; the MCP SDK then serializes the message itself.
+    """
+    if isinstance(payload, str):
+        return payload
+    return payload.decode()
+
+
+# Tool input schemas, advertised by list_tools and compiled once into
+# straight-line validators that also fill in defaults
+_TOOL_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "fetch_survey_data": {
+        "type": "object",
+        "properties": {
+            "survey_id": {
+                "type": "integer",
+                "description": "Specific survey ID to fetch"
+            },
+            "location": {
+                "type": "string",
+                "description": "Filter by location (partial match supported)"
+            },
+            "date_from": {
+                "type": "string",
+                "description": "Start date filter (YYYY-MM-DD format)"
+            },
+            "date_to": {
+                "type": "string",
+                "description": "End date filter (YYYY-MM-DD format)"
+            },
+            "respondent_type": {
+                "type": "string",
+                "description": "Filter by respondent type"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of records to return (default: 100)",
+                "default": 100
+            },
+            "format": {
+                "type": "string",
+                "enum": ["json", "csv"],
+                "description": "Response format; csv is faster for large result sets (default: json)",
+                "default": "json"
+            }
+        },
+        "additionalProperties": False
+    },
+    "get_survey_summary": {
+        "type": "object",
+        "properties": {},
+        "additionalProperties": False
+    },
+    "search_surveys_by_question": {
+        "type": "object",
+        "properties": {
+            "question_text": {
+                "type": "string",
+                "description": "Text to search for in survey questions"
+            },
+            "response_text": {
+                "type": "string",
+                "description": "Text to search for in survey responses"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of records to return (default: 50)",
+                "default": 50
+            }
+        },
+        "additionalProperties": False
+    },
+}
+
+_VALIDATORS = {
+    name: fastjsonschema.compile(schema) for name, schema in _TOOL_SCHEMAS.items()
+}
 
 
 @app.list_resources()
@@ -74,6 +158,29 @@ async def list_resources() -> ListResourcesResult:
     )
 
 
+async def _read_statistics(db: AlloyDBConnection) -> Payload:
+    stats = await db.get_survey_statistics()
+    return _dumps(stats)
+
+
+async def _read_locations(db: AlloyDBConnection) -> Payload:
+    locations = await db.get_locations()
+    return _dumps({"locations": locations})
+
+
+async def _read_respondent_types(db: AlloyDBConnection) -> Payload:
+    types = await db.get_respondent_types()
+    return _dumps({"respondent_types": types})
+
+
+# Resource URI -> handler returning the resource's encoded JSON
+_RESOURCE_HANDLERS: Dict[str, Callable[[AlloyDBConnection], Awaitable[Payload]]] = {
+    "alloydb://surveys/statistics": _read_statistics,
+    "alloydb://surveys/locations": _read_locations,
+    "alloydb://surveys/respondent-types": _read_respondent_types,
+}
+
+
 @app.read_resource()
 async def read_resource(uri: str) -> ReadResourceResult:
     """Read a specific resource"""
@@ -83,41 +190,18 @@ async def read_resource(uri: str) -> ReadResourceResult:
         raise RuntimeError("Database connection not initialized")
     
     try:
-        if uri == "alloydb://surveys/statistics":
-            stats = await db_connection.get_survey_statistics()
-            return ReadResourceResult(
-                contents=[
-                    TextContent(
-                        type="text",
-                        text=json.dumps(stats, indent=2, default=str)
-                    )
-                ]
-            )
-        
-        elif uri == "alloydb://surveys/locations":
-            locations = await db_connection.get_locations()
-            return ReadResourceResult(
-                contents=[
-                    TextContent(
-                        type="text",
-                        text=json.dumps({"locations": locations}, indent=2)
-                    )
-                ]
-            )
-        
-        elif uri == "alloydb://surveys/respondent-types":
-            types = await db_connection.get_respondent_types()
-            return ReadResourceResult(
-                contents=[
-                    TextContent(
-                        type="text",
-                        text=json.dumps({"respondent_types": types}, indent=2)
-                    )
-                ]
-            )
-        
-        else:
+        handler = _RESOURCE_HANDLERS.get(str(uri))
+        if not handler:
             raise ValueError(f"Unknown resource: {uri}")
+        
+        return ReadResourceResult(
+            contents=[
+                TextContent(
+                    type="text",
+                    text=_text(await handler(db_connection))
+                )
+            ]
+        )
     
     except Exception as e:
         logger.error(f"Error reading resource {uri}: {e}")
@@ -139,74 +223,97 @@ async def list_tools() -> ListToolsResult:
             Tool(
                 name="fetch_survey_data",
                 description="Fetch survey data from Alloy DB with optional filters",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "survey_id": {
-                            "type": "integer",
-                            "description": "Specific survey ID to fetch"
-                        },
-                        "location": {
-                            "type": "string",
-                            "description": "Filter by location (partial match supported)"
-                        },
-                        "date_from": {
-                            "type": "string",
-                            "description": "Start date filter (YYYY-MM-DD format)"
-                        },
-                        "date_to": {
-                            "type": "string",
-                            "description": "End date filter (YYYY-MM-DD format)"
-                        },
-                        "respondent_type": {
-                            "type": "string",
-                            "description": "Filter by respondent type"
-                        },
-                        "limit": {
-                            "type": "integer",
-                            "description": "Maximum number of records to return (default: 100)",
-                            "default": 100
-                        }
-                    },
-                    "additionalProperties": False
-                }
+                inputSchema=_TOOL_SCHEMAS["fetch_survey_data"]
             ),
             Tool(
                 name="get_survey_summary",
                 description="Get a summary of survey data including counts and statistics",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "additionalProperties": False
-                }
+                inputSchema=_TOOL_SCHEMAS["get_survey_summary"]
             ),
             Tool(
                 name="search_surveys_by_question",
                 description="Search surveys that contain specific questions or responses",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "question_text": {
-                            "type": "string",
-                            "description": "Text to search for in survey questions"
-                        },
-                        "response_text": {
-                            "type": "string",
-                            "description": "Text to search for in survey responses"
-                        },
-                        "limit": {
-                            "type": "integer",
-                            "description": "Maximum number of records to return (default: 50)",
-                            "default": 50
-                        }
-                    },
-                    "additionalProperties": False
-                }
+                inputSchema=_TOOL_SCHEMAS["search_surveys_by_question"]
             )
         ]
     )
 
 
+async def _fetch_survey_data(db: AlloyDBConnection, arguments: Dict[str, Any]) -> Payload:
+    filters = dict(
+        survey_id=arguments.get("survey_id"),
+        location=arguments.get("location"),
+        date_from=arguments.get("date_from"),
+        date_to=arguments.get("date_to"),
+        respondent_type=arguments.get("respondent_type"),
+        limit=arguments["limit"]
+    )
+    
+    # CSV comes straight off the COPY protocol without per-row records
+    if arguments["format"] == "csv":
+        return await db.get_survey_data_csv(**filters)
+    
+    # Fetch data from database, streamed straight into encoded JSON
+    return await db.get_survey_data_json(**filters)
+
+
+async def _get_survey_summary(db: AlloyDBConnection, arguments: Dict[str, Any]) -> Payload:
+    # The database builds the whole summary as JSON text in one query
+    return await db.get_survey_summary_json()
+
+
+async def _search_surveys_by_question(db: AlloyDBConnection, arguments: Dict[str, Any]) -> Payload:
+    question_text = arguments.get("question_text")
+    response_text = arguments.get("response_text")
+    limit = arguments["limit"]
+    
+    # Build search query; the questions_responses::text expression
+    # matches the trigram index in schema.sql
+    search_conditions = []
+    params = []
+    param_count = 0
+    
+    if question_text:
+        param_count += 1
+        search_conditions.append(f"questions_responses::text ILIKE ${param_count}")
+        params.append(f"%{question_text}%")
+    
+    if response_text:
+        param_count += 1
+        search_conditions.append(f"questions_responses::text ILIKE ${param_count}")
+        params.append(f"%{response_text}%")
+    
+    if not search_conditions:
+        return "Error: At least one search parameter (question_text or response_text) is required"
+    
+    query = f"""
+    SELECT 
+        survey_id,
+        respondent_id,
+        survey_date,
+        location,
+        respondent_type,
+        questions_responses,
+        created_at
+    FROM surveys
+    WHERE {' AND '.join(search_conditions)}
+    ORDER BY survey_date DESC
+    LIMIT ${param_count + 1}
+    """
+    params.append(db.clamp_limit(limit))
+    
+    results = await db.execute_query_json(query, params, key="matching_surveys")
+    return results
+
+
+# Tool name -> handler taking validated arguments and returning the encoded result
+_TOOL_HANDLERS: Dict[str, Callable[[AlloyDBConnection, Dict[str, Any]], Awaitable[Payload]]] = {
+    "fetch_survey_data": _fetch_survey_data,
+    "get_survey_summary": _get_survey_summary,
+    "search_surveys_by_question": _search_surveys_by_question,
+}
+
+
 @app.call_tool()
 async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
     """Handle tool calls"""
@@ -222,122 +329,31 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
             ]
         )
     
+    handler = _TOOL_HANDLERS.get(name)
+    if not handler:
+        return CallToolResult(
+            content=[
+                TextContent(
+                    type="text",
+                    text=f"Error: Unknown tool '{name}'"
+                )
+            ]
+        )
+    
     try:
-        if name == "fetch_survey_data":
-            # Validate and extract parameters
-            params = SurveyQueryParams(**arguments)
-            
-            # Fetch data from database
-            surveys = await db_connection.get_survey_data(
-                survey_id=params.survey_id,
-                location=params.location,
-                date_from=params.date_from,
-                date_to=params.date_to,
-                respondent_type=params.respondent_type,
-                limit=params.limit
-            )
-            
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=json.dumps({
-                            "count": len(surveys),
-                            "surveys": surveys
-                        }, indent=2, default=str)
-                    )
-                ]
-            )
-        
-        elif name == "get_survey_summary":
-            # Get statistics
-            stats = await db_connection.get_survey_statistics()
-            locations = await db_connection.get_locations()
-            respondent_types = await db_connection.get_respondent_types()
-            
-            summary = {
-                "statistics": stats,
-                "available_locations": locations,
-                "available_respondent_types": respondent_types
-            }
-            
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=json.dumps(summary, indent=2, default=str)
-                    )
-                ]
-            )
+        # Validate against the advertised input schema; raises
+        # JsonSchemaException on malformed input and returns the arguments
+        # with schema defaults filled in
+        arguments = _VALIDATORS[name](arguments or {})
         
-        elif name == "search_surveys_by_question":
-            question_text = arguments.get("question_text")
-            response_text = arguments.get("response_text")
-            limit = arguments.get("limit", 50)
-            
-            # Build search query
-            search_conditions = []
-            params = []
-            param_count = 0
-            
-            if question_text:
-                param_count += 1
-                search_conditions.append(f"questions_responses::text ILIKE ${param_count}")
-                params.append(f"%{question_text}%")
-            
-            if response_text:
-                param_count += 1
-                search_conditions.append(f"questions_responses::text ILIKE ${param_count}")
-                params.append(f"%{response_text}%")
-            
-            if not search_conditions:
-                return CallToolResult(
-                    content=[
-                        TextContent(
-                            type="text",
-                            text="Error: At least one search parameter (question_text or response_text) is required"
-                        )
-                    ]
+        return CallToolResult(
+            content=[
+                TextContent(
+                    type="text",
+                    text=_text(await handler(db_connection, arguments))
                 )
-            
-            query = f"""
-            SELECT 
-                survey_id,
-                respondent_id,
-                survey_date,
-                location,
-                respondent_type,
-                questions_responses,
-                created_at
-            FROM surveys
-            WHERE {' AND '.join(search_conditions)}
-            ORDER BY survey_date DESC
-            LIMIT {limit}
-            """
-            
-            results = await db_connection.execute_query(query, params)
-            
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=json.dumps({
-                            "count": len(results),
-                            "matching_surveys": results
-                        }, indent=2, default=str)
-                    )
-                ]
-            )
-        
-        else:
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=f"Error: Unknown tool '{name}'"
-                    )
-                ]
-            )
+            ]
+        )
     
     except Exception as e:
         logger.error(f"Error executing tool '{name}': {e}")
@@ -354,11 +370,15 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
 async def main():
     """Main entry point for the MCP server"""
     global db_connection
+    keepalive_task = None
     
     try:
-        # Initialize database connection
+        # Initialize database connection and open the pool's connections
+        # before the first tool call arrives
         db_connection = AlloyDBConnection()
         await db_connection.initialize()
+        await db_connection.warmup()
+        keepalive_task = asyncio.create_task(db_connection.keepalive())
         
         logger.info("Starting Alloy DB Survey MCP Server")
         
@@ -373,10 +393,21 @@ async def main():
         raise
     
     finally:
+        if keepalive_task:
+            keepalive_task.cancel()
+        
         # Clean up database connection
         if db_connection:
             await db_connection.close()
 
 
+def run():
+    """Run the server on uvloop when it is installed, else the default asyncio loop"""
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
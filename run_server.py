@@ -3,18 +3,17 @@
 Simple script to run the AlloyDB Survey MCP Server
 """
 
-import asyncio
 import sys
 import os
 
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from alloydb_survey_mcp.server import main
+from alloydb_survey_mcp.server import run
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run()
     except KeyboardInterrupt:
         print("\nServer stopped by user")
     except Exception as e:
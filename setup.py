@@ -7,18 +7,21 @@ setup(
     version="1.0.0",
     description="MCP server for fetching on-ground survey data from Alloy DB",
     packages=find_packages(),
-    python_requires=">=3.8",
+    python_requires=">=3.10",
     install_requires=[
         "mcp>=1.0.0",
         "google-cloud-alloydb-connectors>=1.0.0",
         "psycopg2-binary>=2.9.0",
-        "asyncpg>=0.29.0",
-        "pydantic>=2.0.0",
+        "asyncpg>=0.30.0",
+        "orjson>=3.9.0",
+        "async-lru>=2.0.0",
+        "fastjsonschema>=2.18.0",
+        "uvloop>=0.18.0; sys_platform != 'win32'",
         "python-dotenv>=1.0.0",
     ],
     entry_points={
         "console_scripts": [
-            "alloydb-survey-server=alloydb_survey_mcp.server:main",
+            "alloydb-survey-server=alloydb_survey_mcp.server:run",
         ],
     },
 )